@@ -0,0 +1,142 @@
+"""
+Admission control for database-bound API routes.
+
+Reads (GET) and writes (other methods) have separate limiters: bounded number of concurrent requests,
+a short wait queue, and a fast 503 with Retry-After when the queue is full or the wait takes too long.
+Admitted requests run their transactions with the statement timeout of their route class (see db.statement_timeout),
+a cancelled statement is answered with 503 and Retry-After as well.
+Limits can be set by env variables, defaults keep reads + writes within the default engine pool (5 + 10 overflow).
+Queue depth and counters are exported by the AdmissionStats API resource.
+"""
+
+import functools
+import os
+import threading
+
+import sqlalchemy.exc
+from flask import request
+from psycopg2.errors import QueryCanceled
+
+import src.db as db
+
+READS = 'reads'
+WRITES = 'writes'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+RETRY_AFTER = int(os.getenv('RETRY_AFTER', 1))
+
+
+class AdmissionLimiter:
+    """Bounded concurrency with a bounded wait queue"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 statement_timeout: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.statement_timeout = statement_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.statement_timeouts = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting for up to queue_timeout seconds. Returns False if rejected"""
+        with self._cond:
+            if self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                try:
+                    has_slot = self._cond.wait_for(lambda: self.active < self.max_concurrency, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not has_slot:
+                    self.timed_out += 1
+                    return False
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self) -> None:
+        """Free a slot taken by acquire()"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def count_statement_timeout(self) -> None:
+        """Count an admitted request cancelled by its statement timeout"""
+        with self._cond:
+            self.statement_timeouts += 1
+
+    def stats(self) -> dict:
+        """Current queue depth, limits and counters"""
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'statement_timeouts': self.statement_timeouts,
+            }
+
+
+limiters = {
+    READS: AdmissionLimiter(READS,
+                            max_concurrency=int(os.getenv('READ_CONCURRENCY', 10)),
+                            max_queue=int(os.getenv('READ_QUEUE', 20)),
+                            queue_timeout=float(os.getenv('READ_QUEUE_TIMEOUT', 0.5)),
+                            statement_timeout=int(os.getenv('READ_STATEMENT_TIMEOUT', 2000))),
+    WRITES: AdmissionLimiter(WRITES,
+                             max_concurrency=int(os.getenv('WRITE_CONCURRENCY', 5)),
+                             max_queue=int(os.getenv('WRITE_QUEUE', 10)),
+                             queue_timeout=float(os.getenv('WRITE_QUEUE_TIMEOUT', 0.5)),
+                             statement_timeout=int(os.getenv('WRITE_STATEMENT_TIMEOUT', 5000))),
+}
+
+
+def is_statement_timeout(e: Exception) -> bool:
+    """True if e is a statement cancelled by statement_timeout"""
+    return isinstance(e, sqlalchemy.exc.OperationalError) and isinstance(e.orig, QueryCanceled)
+
+
+def raise_if_statement_timeout(e: Exception) -> None:
+    """Re-raise e if it is a statement timeout, so that admit() answers it with 503 (for routes handling db errors)"""
+    if is_statement_timeout(e):
+        raise e
+
+
+def admit(func):
+    """Resource method decorator: run the request within the limits of its route class or return 503"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        limiter = limiters[READS if request.method in READ_METHODS else WRITES]
+        if not limiter.acquire():
+            return {'Error 503': f'too many {limiter.name}, retry later'}, 503, {'Retry-After': str(RETRY_AFTER)}
+        token = db.statement_timeout.set(limiter.statement_timeout)
+        try:
+            return func(*args, **kwargs)
+        except sqlalchemy.exc.OperationalError as e:
+            if not is_statement_timeout(e):
+                raise
+            limiter.count_statement_timeout()
+            return {'Error 503': f'{limiter.name} statement timeout, retry later'}, 503, \
+                   {'Retry-After': str(RETRY_AFTER)}
+        finally:
+            db.statement_timeout.reset(token)
+            limiter.release()
+
+    return wrapper
+
+
+def stats() -> dict:
+    """Stats of all the limiters by route class"""
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -1,9 +1,12 @@
 """Flask restful API resources are defined here"""
 
-from flask_restful import Resource, marshal_with, fields, reqparse
+from flask_restful import Resource, marshal_with, marshal, fields, reqparse
 import sqlalchemy.exc
 
 import src.db as db
+from src import admission
+from src.batching import enrollment_writer
+from src.snapshot import reader
 
 STUDENT_FIELDS = {
     'id': fields.String(attribute='id'),
@@ -13,7 +16,12 @@ STUDENT_FIELDS = {
 }
 
 
-class ListStudents(Resource):
+class LimitedResource(Resource):
+    """Resource with admission control: reads and writes are limited separately (see admission.py)"""
+    method_decorators = [admission.admit]
+
+
+class ListStudents(LimitedResource):
     """Lists students with info"""
     student_fields = STUDENT_FIELDS.copy()
     student_fields.update(
@@ -22,10 +30,10 @@ class ListStudents(Resource):
 
     @marshal_with(student_fields, envelope='Students')
     def get(self):
-        return db.get_all_students()
+        return reader().get_all_students()
 
 
-class Student(Resource):
+class Student(LimitedResource):
     """Detailed info about one student. Also supports delete method for deletion"""
     student_fields = STUDENT_FIELDS.copy()
     student_fields.update(
@@ -34,21 +42,22 @@ class Student(Resource):
 
     @marshal_with(student_fields, envelope='Student')
     def get(self, student_id):
-        return db.get_student(student_id)
+        return reader().get_student(student_id)
 
     def delete(self, student_id):
         """Delete student by id"""
         try:
             res = db.delete_student(student_id)
-        except sqlalchemy.exc.SQLAlchemyError:
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            admission.raise_if_statement_timeout(e)
             return {'error 400': 'bad request'}, 400
         if res:
-            return {'deleted student with id': student_id}, 200
+            return {'deleted student with id': student_id, 'Student': marshal(res, self.student_fields)}, 200
         else:
             return {'error 404': f'not found student with id {student_id}'}, 404
 
 
-class AddStudent(Resource):
+class AddStudent(LimitedResource):
     """Add student to db by post request with first_name, last_name, group_id"""
 
     def post(self):
@@ -56,12 +65,13 @@ class AddStudent(Resource):
         args = parser.parse_args()
         try:
             res = db.add_student(args['first_name'], args['last_name'], int(args['group_id']))
-        except (sqlalchemy.exc.SQLAlchemyError, TypeError):
+        except (sqlalchemy.exc.SQLAlchemyError, TypeError) as e:
+            admission.raise_if_statement_timeout(e)
             return {'error 400': 'bad request'}, 400
-        return {'student created with id': res[0]}, 201
+        return {'student created with id': res['id'], 'Student': marshal(res, Student.student_fields)}, 201
 
 
-class GroupsWithFewerOrEqualStudents(Resource):
+class GroupsWithFewerOrEqualStudents(LimitedResource):
     """Return groups with fewer or equal number of students"""
     group_fields = {
         'group_name': fields.String(attribute='name'),
@@ -70,10 +80,10 @@ class GroupsWithFewerOrEqualStudents(Resource):
 
     @marshal_with(group_fields, envelope='Groups')
     def get(self, n=20):
-        return db.find_groups_with_fewer_or_equal_students(n)
+        return reader().find_groups_with_fewer_or_equal_students(n)
 
 
-class StudentsFromCourse(Resource):
+class StudentsFromCourse(LimitedResource):
     """Return students from the specified course name (partly and case-insensitive)"""
     student_fields = STUDENT_FIELDS.copy()
     student_fields.update({
@@ -82,29 +92,31 @@ class StudentsFromCourse(Resource):
 
     @marshal_with(student_fields, envelope='Students')
     def get(self, course_name):
-        return db.find_students_from_course(course_name)
+        return reader().find_students_from_course(course_name)
 
 
-class StudentToCourse(Resource):
+class StudentToCourse(LimitedResource):
     """Add student to course by their names (case insensitive for both, part-string for course)"""
 
     def post(self):
         args = parser.parse_args()
         try:
-            db.add_student_to_course(args['student_name'], args['course_name'])
-        except sqlalchemy.exc.SQLAlchemyError:
+            res = enrollment_writer().add_student_to_course(args['student_name'], args['course_name'])
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            admission.raise_if_statement_timeout(e)
             return {'Error 400': 'bad request'}, 400
-        return {'Success': 'Student added to the course'}, 201
+        return {'Success': 'Student added to the course', 'Student': marshal(res, Student.student_fields)}, 201
 
 
-class StudentRemoveCourse(Resource):
+class StudentRemoveCourse(LimitedResource):
     """Remove a student from a course by ids"""
 
     def delete(self):
         args = parser.parse_args()
         try:
-            res = db.remove_student_from_course(args['student_id'], args['course_id'])
-        except sqlalchemy.exc.SQLAlchemyError:
+            res = enrollment_writer().remove_student_from_course(args['student_id'], args['course_id'])
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            admission.raise_if_statement_timeout(e)
             return {'Error 400': 'bad request'}, 400
         if res:
             return {'Success': 'Student removed from the course'}, 200
@@ -112,6 +124,28 @@ class StudentRemoveCourse(Resource):
             return {'Error 404': 'Student not in the course'}, 404
 
 
+class SuggestStudents(Resource):
+    """Autocomplete student full names by prefix (?q=), served from memory without touching the db"""
+    student_fields = {
+        'id': fields.String(attribute='id'),
+        'first_name': fields.String(attribute='first_name'),
+        'last_name': fields.String(attribute='last_name'),
+    }
+
+    @marshal_with(student_fields, envelope='Students')
+    def get(self):
+        args = suggest_parser.parse_args()
+        return db.suggest_students(args['q'], args['limit'])
+
+
+class AdmissionStats(Resource):
+    """Queue depth, limits and rejection counters of admission control by route class, db pool usage.
+    Not limited itself"""
+
+    def get(self):
+        return {'Admission': admission.stats(), 'Pool': db.pool_stats()}
+
+
 parser = reqparse.RequestParser()
 parser.add_argument('first_name')
 parser.add_argument('last_name')
@@ -120,3 +154,7 @@ parser.add_argument('student_name')
 parser.add_argument('course_name')
 parser.add_argument('student_id')
 parser.add_argument('course_id')
+
+suggest_parser = reqparse.RequestParser()
+suggest_parser.add_argument('q', location='args', default='')
+suggest_parser.add_argument('limit', type=int, location='args', default=10)
@@ -2,6 +2,9 @@
 Main app module. Creates db if it doesn't exist.
 For database URL, role and password see db.py.
 Rebuilds database if -r (--rebuild) is passed in CLI.
+Enables group commit for enrollment changes if -g (--group-commit) is passed (see batching.py).
+Enables read cache invalidated via LISTEN/NOTIFY if -c (--cache) is passed (see cache.py).
+Serves reads from a local SQLite snapshot in the directory passed with -s (--snapshot) (see snapshot.py).
 """
 
 import argparse
@@ -18,9 +21,11 @@ from src.api_resources import (
     GroupsWithFewerOrEqualStudents,
     StudentsFromCourse,
     StudentToCourse,
-    StudentRemoveCourse
+    StudentRemoveCourse,
+    SuggestStudents,
+    AdmissionStats
 )
-from src import db
+from src import db, batching, cache, snapshot
 
 API_PREFIX = '/api/v1/'
 
@@ -36,9 +41,17 @@ api.add_resource(GroupsWithFewerOrEqualStudents, API_PREFIX + 'groups_LE/<int:n>
 api.add_resource(StudentsFromCourse, API_PREFIX + 'students/from_course/<string:course_name>/')
 api.add_resource(StudentToCourse, API_PREFIX + 'students/add_course/')
 api.add_resource(StudentRemoveCourse, API_PREFIX + 'students/remove_course/')
+api.add_resource(SuggestStudents, API_PREFIX + 'students/suggest', API_PREFIX + 'students/suggest/')
+api.add_resource(AdmissionStats, API_PREFIX + 'admission/')
 
 parser = argparse.ArgumentParser('Interaction with students database')
 parser.add_argument('-r', '--rebuild', action='store_true', help='Rebuild the database with newly generated data')
+parser.add_argument('-g', '--group-commit', action='store_true',
+                    help='Batch enrollment changes into group commits (flushed every few ms or N changes)')
+parser.add_argument('-c', '--cache', action='store_true',
+                    help='Cache reads in process, invalidated by NOTIFY from any writer process')
+parser.add_argument('-s', '--snapshot', metavar='DIR',
+                    help='Serve reads from a local SQLite snapshot in DIR, refreshed when data changes')
 
 if __name__ == '__main__':
     if not database_exists(db.engine.url):
@@ -47,4 +60,11 @@ if __name__ == '__main__':
     args = parser.parse_args()
     if args.rebuild:
         db.insert_initial_data()
+    if args.group_commit:
+        batching.enable_group_commit()
+    if args.cache:
+        cache.enable_cache()
+    if args.snapshot:
+        snapshot.enable_snapshot(args.snapshot)
+    cache.enable_name_index_updates()
     app.run()
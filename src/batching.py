@@ -0,0 +1,173 @@
+"""
+Group commit for enrollment changes (student_course rows).
+
+Enrollment writes are put into an in-process queue and flushed by a background thread
+as one multi-row statement per run of same-kind changes, all in one transaction,
+every max_delay seconds or every max_items changes - whichever comes first.
+Callers block until the transaction with their change is committed and get the same result
+the corresponding db function would return. Adds the batch skips (e.g. duplicate enrollments) are run
+one by one after the commit, so every caller gets its own result or error. If the batch fails as a whole,
+it is rolled back and all its changes are replayed one by one.
+Group commit is optional - see enable_group_commit() and the -g CLI option in app.py.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from itertools import groupby
+
+from sqlalchemy import delete, tuple_
+
+import src.db as db
+
+logger = logging.getLogger(__name__)
+
+ADD = 'add'
+REMOVE = 'remove'
+
+enrollment_batcher = None
+
+
+class EnrollmentBatcher:
+    """Coalesces add/remove student-to-course changes into batched transactions"""
+
+    def __init__(self, max_items: int = 100, max_delay: float = 0.005):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='enrollment-batcher', daemon=True)
+        self._worker.start()
+
+    def add_student_to_course(self, full_name: str, course_name: str) -> dict:
+        """Same as db.add_student_to_course, but committed within a batch"""
+        values = db.student_course_values(full_name, course_name)  # raises for bad names in the caller's thread
+        return self._submit(ADD, (full_name, course_name), values)
+
+    def remove_student_from_course(self, student_id: int, course_id: int) -> int:
+        """Same as db.remove_student_from_course, but committed within a batch"""
+        try:
+            pair = int(student_id), int(course_id)
+        except (TypeError, ValueError):
+            # let the db report invalid ids exactly as it does without batching
+            return db.remove_student_from_course(student_id, course_id)
+        return self._submit(REMOVE, (student_id, course_id), pair)
+
+    def close(self) -> None:
+        """Flush pending changes and stop the background thread"""
+        self._stopped.set()
+        self._worker.join()
+
+    def _submit(self, kind: str, args: tuple, payload):
+        if self._stopped.is_set():
+            raise RuntimeError('EnrollmentBatcher is closed')
+        future = Future()
+        # the worker thread does not see the caller's context, the timeout goes with the change
+        self._queue.put((kind, args, payload, future, db.statement_timeout.get()))
+        return future.result()
+
+    def _run(self) -> None:
+        while not (self._stopped.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            # the first change waits at most max_delay, however many arrive after it
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # changes of one batch come from the same route class, so their timeouts are the same
+            timeouts = [item[4] for item in batch if item[4]]
+            token = db.statement_timeout.set(max(timeouts) if timeouts else None)
+            try:
+                self._flush(batch)
+            finally:
+                db.statement_timeout.reset(token)
+
+    def _flush(self, batch: list) -> None:
+        """Execute the batch in one transaction. Results are set only after the commit.
+
+        Adds that the batch statement skipped (already enrolled, unknown names) are run one by one afterwards,
+        so their callers get the same result or error as without batching"""
+        try:
+            results = []
+            with db.engine.connect() as conn:
+                for kind, items in groupby(batch, key=lambda item: item[0]):
+                    payloads = [item[2] for item in items]
+                    if kind == ADD:
+                        results.extend(db.add_students_to_courses(conn, payloads, skip_failed=True))
+                    else:
+                        results.extend(_delete_many(conn, payloads))
+                changes = db.commit_changes(conn)
+        except Exception:
+            self._replay(batch)
+            return
+        try:
+            db.run_change_hooks(changes)
+        except Exception:
+            logger.exception('Change hooks failed for a committed batch')
+        skipped = []
+        for item, res in zip(batch, results):
+            if res is None:
+                skipped.append(item)
+            else:
+                item[3].set_result(res)
+        self._replay(skipped)
+
+    @staticmethod
+    def _replay(batch: list) -> None:
+        """Run changes one by one in their own transactions, passing every error to its caller"""
+        for kind, args, _, future, _ in batch:
+            func = db.add_student_to_course if kind == ADD else db.remove_student_from_course
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+
+def _delete_many(conn, pairs: list) -> list:
+    """Delete (student, course) rows by one statement, return rowcount for each pair.
+
+    A pair repeated in one batch is deleted only once - like in serial execution, the later ones get 0."""
+    sc = db.student_course
+    stmt = delete(sc) \
+        .where(tuple_(sc.c.student, sc.c.course).in_(set(pairs))) \
+        .returning(sc.c.student, sc.c.course)
+    deleted = {tuple(row) for row in conn.execute(stmt)}
+    if deleted:
+        db.notify_changes(conn, sc.name, sorted({student_id for student_id, _ in deleted}))
+    results = []
+    for pair in pairs:
+        results.append(int(pair in deleted))
+        deleted.discard(pair)
+    return results
+
+
+def enable_group_commit(max_items: int = 100, max_delay: float = 0.005) -> EnrollmentBatcher:
+    """Route enrollment changes made via API through a new EnrollmentBatcher"""
+    global enrollment_batcher
+    disable_group_commit()
+    enrollment_batcher = EnrollmentBatcher(max_items, max_delay)
+    return enrollment_batcher
+
+
+def disable_group_commit() -> None:
+    """Flush and stop the current EnrollmentBatcher (if any), API will write directly via db"""
+    global enrollment_batcher
+    if enrollment_batcher is not None:
+        enrollment_batcher.close()
+        enrollment_batcher = None
+
+
+def enrollment_writer():
+    """Return the object to make enrollment changes with: the batcher if group commit is enabled, otherwise db"""
+    return enrollment_batcher or db
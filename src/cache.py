@@ -0,0 +1,207 @@
+"""
+In-process cache of the read queries, kept coherent across processes by PostgreSQL LISTEN/NOTIFY.
+
+Write functions in db.py publish the ids of changed students to db.CHANGES_CHANNEL (see db.notify_changes).
+Every process with the cache enabled runs an InvalidationListener, which evicts only the affected entries:
+student rows - cached students and all aggregates, student_course rows - cached students and the student list.
+Changes committed by this process are evicted right after the commit (see db.change_hooks), so its readers
+see their own writes; notifications from other processes are delivered after their commit, with a short delay.
+While the listener is not connected, the cache is dropped and reads go directly to db.
+Caching is optional - see enable_cache() and the -c CLI option in app.py.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+from typing import Optional
+
+import src.db as db
+
+logger = logging.getLogger(__name__)
+
+read_cache = None
+listener = None
+name_index_listener = None
+
+
+class ReadCache:
+    """Caches get_student, get_all_students and find_groups_with_fewer_or_equal_students results"""
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._students = {}
+        self._all_students = {}
+        self._groups = {}
+
+    def get_student(self, id: int) -> dict:
+        """Same as db.get_student, cached by student id"""
+        return self._cached(self._students, int(id), db.get_student)
+
+    def get_all_students(self) -> list:
+        """Same as db.get_all_students, cached"""
+        return self._cached(self._all_students, None, lambda _: db.get_all_students())
+
+    def find_groups_with_fewer_or_equal_students(self, n: int = 20) -> list:
+        """Same as db.find_groups_with_fewer_or_equal_students, cached by n"""
+        return self._cached(self._groups, n, db.find_groups_with_fewer_or_equal_students)
+
+    @staticmethod
+    def find_students_from_course(course_name: str) -> list:
+        """Same as db.find_students_from_course, not cached (arbitrary substrings)"""
+        return db.find_students_from_course(course_name)
+
+    def evict(self, table: str, ids: Optional[list]) -> None:
+        """Evict entries affected by a change of rows with ids (None - all rows) in the table"""
+        with self._lock:
+            self._generation += 1
+            self._all_students.clear()
+            if ids is None:
+                self._students.clear()
+                self._groups.clear()
+                return
+            for id in ids:
+                self._students.pop(int(id), None)
+            if table == db.student.name:
+                self._groups.clear()
+
+    def clear(self) -> None:
+        """Evict all entries"""
+        self.evict(db.student.name, None)
+
+    def activate(self) -> None:
+        """Start caching (invalidations are being received)"""
+        self.clear()
+        self.active = True
+
+    def deactivate(self) -> None:
+        """Stop caching and serve directly from db (invalidations could be missed)"""
+        self.active = False
+        self.clear()
+
+    def _cached(self, entries: dict, key, query):
+        """Return entries[key] or load it by query(key).
+
+        The result is stored only if nothing was evicted while loading, otherwise it could be already stale."""
+        if not self.active:
+            return query(key)
+        with self._lock:
+            if key in entries:
+                return entries[key]
+            generation = self._generation
+        res = query(key)
+        with self._lock:
+            if generation == self._generation:
+                entries[key] = res
+        return res
+
+
+class NameIndexUpdater:
+    """Keeps db.name_index up to date with student changes of all processes, driven by an InvalidationListener"""
+
+    @staticmethod
+    def evict(table: str, ids: Optional[list]) -> None:
+        """Reload names of the changed students (enrollments do not change names)"""
+        if table == db.student.name:
+            db.refresh_name_index(ids)
+
+    @staticmethod
+    def activate() -> None:
+        """Rebuild the index: changes before LISTEN could be missed"""
+        db.load_name_index()
+
+    @staticmethod
+    def deactivate() -> None:
+        """Keep serving the last names, rebuilt when activated again"""
+
+
+class InvalidationListener(threading.Thread):
+    """Background thread: LISTENs to db.CHANGES_CHANNEL on its own connection and evicts changed entries.
+
+    cache can be anything with evict, activate and deactivate methods (e.g. snapshot.SnapshotReader)"""
+
+    def __init__(self, cache: ReadCache, poll_timeout: float = 1.0, retry_delay: float = 1.0):
+        super().__init__(name='cache-invalidation', daemon=True)
+        self.cache = cache
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Cache invalidation listener failed, reconnecting')
+                time.sleep(self.retry_delay)
+
+    def _listen(self) -> None:
+        raw = db.engine.raw_connection()
+        raw.detach()  # the connection is kept LISTENing, so it must not go back to the pool
+        conn = raw.connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN {db.CHANGES_CHANNEL}')
+            # anything written before LISTEN was not seen by this listener
+            self.cache.activate()
+            while not self._stopped.is_set():
+                if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    change = json.loads(conn.notifies.pop(0).payload)
+                    self.cache.evict(change['table'], change['ids'])
+        finally:
+            self.cache.deactivate()
+            conn.close()
+
+
+def enable_cache() -> ReadCache:
+    """Serve API reads from a new ReadCache kept coherent by an InvalidationListener"""
+    global read_cache, listener
+    disable_cache()
+    read_cache = ReadCache()
+    db.change_hooks.append(read_cache.evict)
+    listener = InvalidationListener(read_cache)
+    listener.start()
+    return read_cache
+
+
+def disable_cache() -> None:
+    """Stop the listener and drop the cache (if any), API will read directly via db"""
+    global read_cache, listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+    if read_cache is not None:
+        db.change_hooks.remove(read_cache.evict)
+    read_cache = None
+
+
+def enable_name_index_updates() -> None:
+    """Keep db.name_index up to date with writes of other processes too"""
+    global name_index_listener
+    disable_name_index_updates()
+    name_index_listener = InvalidationListener(NameIndexUpdater())
+    name_index_listener.start()
+
+
+def disable_name_index_updates() -> None:
+    """Stop the name index listener (if any), the index will reflect only writes of this process"""
+    global name_index_listener
+    if name_index_listener is not None:
+        name_index_listener.stop()
+        name_index_listener = None
+
+
+def reader():
+    """Return the object to read with: the cache if enabled, otherwise db"""
+    return read_cache or db
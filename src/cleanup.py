@@ -0,0 +1,44 @@
+"""
+Bulk deletion of students by group, id range and/or course (filters are combined), in short batches.
+Every batch is committed separately, with a pause between batches, so large cleanups do not hold long locks
+(see db.delete_students_in_batches). Progress is printed after every batch.
+
+Usage: python -m src.cleanup --group 3 --batch-size 500 --pause 0.1
+"""
+
+import argparse
+import time
+
+from src import db
+
+parser = argparse.ArgumentParser('Delete students by filter in short batches')
+parser.add_argument('--group', type=int, help='Group id')
+parser.add_argument('--id-from', type=int, help='First student id of the range (inclusive)')
+parser.add_argument('--id-to', type=int, help='Last student id of the range (inclusive)')
+parser.add_argument('--course', type=int, help='Id of the course the students attend')
+parser.add_argument('--batch-size', type=int, default=1000, help='Students deleted per transaction')
+parser.add_argument('--pause', type=float, default=0.1, help='Seconds between batches')
+parser.add_argument('--dry-run', action='store_true', help='Only count the matching students')
+
+
+def run(args: argparse.Namespace) -> int:
+    """Delete the students matching args printing the progress, return the number deleted"""
+    filters = db.student_filters(args.group, args.id_from, args.id_to, args.course)
+    total = db.count_students(filters)
+    print(f'{total} students match')
+    if args.dry_run:
+        return 0
+    deleted = 0
+    started = time.monotonic()
+    for count in db.delete_students_in_batches(filters, args.batch_size, args.pause):
+        deleted += count
+        print(f'deleted {deleted}/{total} ({time.monotonic() - started:.1f}s)', flush=True)
+    return deleted
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    try:
+        run(args)
+    except ValueError as e:
+        parser.error(str(e))
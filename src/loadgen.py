@@ -0,0 +1,303 @@
+"""
+Load generator for the API: drives the /api/v1 routes of a running app (python -m src.app)
+with a mix of reads, searches and writes at target request rates from many concurrent clients.
+
+Requests are scheduled open-loop at the target rate and latency is measured from the scheduled time,
+so a saturated server shows up as growing latency instead of a silently lower request rate.
+Every rate step prints samples over time (throughput, errors, latency, admission queues and db pool usage)
+and a latency summary per operation. Run increasing rates to find the throughput knee, e.g.:
+
+python -m src.loadgen --rates 50,100,200,400 --duration 20 --clients 32 --mix 70,20,10
+"""
+
+import argparse
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit, quote
+
+from src import data
+from src.app import API_PREFIX
+
+READ = 'read'
+SEARCH = 'search'
+WRITE = 'write'
+
+
+class Client:
+    """HTTP client with a keep-alive connection per thread"""
+
+    def __init__(self, url: str, timeout: float = 30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, form: dict = None) -> tuple:
+        """Return (status, body) of the response. Raises OSError or HTTPException if the request failed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        body, headers = None, {}
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def get_json(self, path: str) -> dict:
+        status, body = self.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f'GET {path} returned {status}')
+        return json.loads(body)
+
+
+class Workload:
+    """Random requests of the given mix of reads, searches and writes.
+
+    Student ids, course ids and new student names come from data.py generators,
+    names of the existing students (to add them to courses by name) are fetched from the API."""
+
+    def __init__(self, mix: dict, names: dict, n_students: int = 200, n_groups: int = 10):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.names = names
+        self.student_ids = [id for id in range(1, n_students + 1) if id in names] or list(range(1, n_students + 1))
+        self.n_groups = n_groups
+        # only existing students, so that add_course always has a name to send
+        self.enrollments = [(student_id, course_id) for student_id, courses in
+                            zip(self.student_ids,
+                                data.generate_student_courses(len(data.COURSES), len(self.student_ids)))
+                            for course_id in courses]
+        self.new_students = data.generate_students(len(data.FIRST_NAMES) * len(data.LAST_NAMES))
+        self.created = deque()
+
+    def next_request(self) -> tuple:
+        """Return (operation, method, path, form) of a random request"""
+        kind = random.choices(self.kinds, self.weights)[0]
+        return getattr(self, f'_{kind}')()
+
+    def observe(self, operation: str, status: int, body: bytes) -> None:
+        """Remember ids of created students to delete them later"""
+        if operation == 'add_student' and status == 201:
+            self.created.append(json.loads(body)['Student']['id'])
+
+    def _read(self) -> tuple:
+        operation = random.choice(['get_student', 'list_students', 'groups_le'])
+        if operation == 'get_student':
+            return operation, 'GET', API_PREFIX + f'students/{random.choice(self.student_ids)}/', None
+        if operation == 'list_students':
+            return operation, 'GET', API_PREFIX + 'students/', None
+        return operation, 'GET', API_PREFIX + f'groups_LE/{random.randint(10, 30)}/', None
+
+    def _search(self) -> tuple:
+        if random.random() < 0.5:
+            course = random.choice(data.COURSES)[:random.randint(3, 6)].lower()
+            return 'from_course', 'GET', API_PREFIX + f'students/from_course/{quote(course)}/', None
+        name = random.choice(data.FIRST_NAMES)
+        return 'suggest', 'GET', API_PREFIX + f'students/suggest?q={quote(name[:random.randint(1, 3)])}', None
+
+    def _write(self) -> tuple:
+        operation = random.choice(['add_course', 'remove_course', 'add_student', 'delete_student'])
+        if operation == 'add_course':
+            student_id, course_id = random.choice(self.enrollments)
+            form = {'student_name': self.names.get(student_id, ''), 'course_name': data.COURSES[course_id - 1]}
+            return operation, 'POST', API_PREFIX + 'students/add_course/', form
+        if operation == 'remove_course':
+            student_id, course_id = random.choice(self.enrollments)
+            form = {'student_id': student_id, 'course_id': course_id}
+            return operation, 'DELETE', API_PREFIX + 'students/remove_course/', form
+        if operation == 'delete_student' and self.created:
+            try:
+                return operation, 'DELETE', API_PREFIX + f'students/{self.created.popleft()}/', None
+            except IndexError:
+                pass
+        first, last = random.choice(self.new_students)
+        form = {'first_name': first, 'last_name': last, 'group_id': random.randint(1, self.n_groups)}
+        return 'add_student', 'POST', API_PREFIX + 'students/add/', form
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile of sorted values (0 for no values)"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def classify(status) -> str:
+    """Result class of a response status (None - the request failed)"""
+    if status is None or (status >= 500 and status != 503):
+        return 'errors'
+    if status == 503:
+        return 'shed'
+    if status >= 400:
+        return 'client_errors'
+    return 'ok'
+
+
+class Recorder:
+    """Thread-safe latency and result counters per operation, also per sampling interval"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.results = defaultdict(lambda: defaultdict(int))
+        self._interval = []
+
+    def record(self, operation: str, latency: float, status) -> None:
+        result = classify(status)
+        with self._lock:
+            self.latencies[operation].append(latency)
+            self.results[operation][result] += 1
+            self._interval.append((latency, result))
+
+    def take_interval(self, seconds: float) -> dict:
+        """Return stats of requests completed since the previous call and start a new interval"""
+        with self._lock:
+            interval, self._interval = self._interval, []
+        latencies = sorted(latency for latency, _ in interval)
+        results = defaultdict(int)
+        for _, result in interval:
+            results[result] += 1
+        return {
+            'rps': len(interval) / seconds,
+            'errors': results['errors'],
+            'shed': results['shed'],
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+
+    def summary(self) -> dict:
+        """Count, result rates and latency percentiles (ms) per operation"""
+        res = {}
+        with self._lock:
+            for operation, values in self.latencies.items():
+                values = sorted(values)
+                count = len(values)
+                results = self.results[operation]
+                res[operation] = {
+                    'count': count,
+                    'error_rate': results['errors'] / count,
+                    'shed_rate': results['shed'] / count,
+                    'client_error_rate': results['client_errors'] / count,
+                    'p50_ms': percentile(values, 50) * 1000,
+                    'p90_ms': percentile(values, 90) * 1000,
+                    'p99_ms': percentile(values, 99) * 1000,
+                    'max_ms': values[-1] * 1000,
+                }
+        return res
+
+
+def issue(client: Client, workload: Workload, recorder: Recorder, scheduled: float) -> None:
+    """Send one random request and record its latency from the scheduled time"""
+    operation, method, path, form = workload.next_request()
+    status, body = None, b''
+    try:
+        status, body = client.request(method, path, form)
+    except (http.client.HTTPException, OSError):
+        pass
+    recorder.record(operation, time.monotonic() - scheduled, status)
+    workload.observe(operation, status, body)
+
+
+def sample(client: Client, recorder: Recorder, elapsed: float, interval: float) -> dict:
+    """Interval stats with server-side admission queues and db pool usage (if available)"""
+    res = {'t': round(elapsed, 1)}
+    res.update(recorder.take_interval(interval))
+    try:
+        stats = client.get_json(API_PREFIX + 'admission/')
+    except (RuntimeError, ValueError, http.client.HTTPException, OSError):
+        return res
+    for route_class, limiter in stats['Admission'].items():
+        res[f'{route_class}_active'] = limiter['active']
+        res[f'{route_class}_waiting'] = limiter['waiting']
+    res['pool_checked_out'] = stats['Pool']['checked_out']
+    res['pool_size'] = stats['Pool']['size']
+    return res
+
+
+def run_step(client: Client, workload: Workload, rate: float, duration: float, clients: int,
+             interval: float = 1.0) -> dict:
+    """Run the workload at the target rate for duration seconds. Returns samples over time and summary"""
+    recorder = Recorder()
+    samples = []
+    done = threading.Event()
+    start = time.monotonic()
+
+    def sampler():
+        while not done.wait(interval):
+            samples.append(sample(client, recorder, time.monotonic() - start, interval))
+            print(format_sample(samples[-1]), flush=True)
+
+    sampler_thread = threading.Thread(target=sampler, daemon=True)
+    sampler_thread.start()
+    with ThreadPoolExecutor(clients) as executor:
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(issue, client, workload, recorder, scheduled)
+    elapsed = time.monotonic() - start
+    done.set()
+    sampler_thread.join()
+    summary = recorder.summary()
+    total = sum(op['count'] for op in summary.values())
+    return {'rate': rate, 'achieved_rps': total / elapsed, 'samples': samples, 'summary': summary}
+
+
+def format_sample(s: dict) -> str:
+    line = f"t={s['t']:>6}s rps={s['rps']:8.1f} errors={s['errors']:<4} shed={s['shed']:<4} " \
+           f"p50={s['p50_ms']:8.1f}ms p99={s['p99_ms']:8.1f}ms"
+    if 'pool_checked_out' in s:
+        line += f" reads={s['reads_active']}/{s['reads_waiting']} writes={s['writes_active']}/{s['writes_waiting']}" \
+                f" pool={s['pool_checked_out']}/{s['pool_size']}"
+    return line
+
+
+def format_summary(step: dict) -> str:
+    lines = [f"target {step['rate']} rps, achieved {step['achieved_rps']:.1f} rps",
+             f"{'operation':<16}{'count':>8}{'errors':>8}{'shed':>8}{'4xx':>8}"
+             f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for operation, s in sorted(step['summary'].items()):
+        lines.append(f"{operation:<16}{s['count']:>8}{s['error_rate']:>8.1%}{s['shed_rate']:>8.1%}"
+                     f"{s['client_error_rate']:>8.1%}{s['p50_ms']:>10.1f}{s['p90_ms']:>10.1f}"
+                     f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    return '\n'.join(lines)
+
+
+parser = argparse.ArgumentParser('Mixed-workload load generator for the students API')
+parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the running app')
+parser.add_argument('--rates', default='50,100,200', help='Comma-separated target request rates (rps), one step each')
+parser.add_argument('--duration', type=float, default=20, help='Seconds per rate step')
+parser.add_argument('--clients', type=int, default=32, help='Number of concurrent clients')
+parser.add_argument('--mix', default='70,20,10', help='Percentages of reads, searches and writes')
+parser.add_argument('--interval', type=float, default=1.0, help='Seconds between samples')
+parser.add_argument('--output', help='Write samples and summaries of all steps to this JSON file')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    client = Client(args.url)
+    students = client.get_json(API_PREFIX + 'students/')['Students']
+    names = {int(s['id']): f"{s['first_name']} {s['last_name']}" for s in students}
+    mix = dict(zip((READ, SEARCH, WRITE), map(float, args.mix.split(','))))
+    workload = Workload(mix, names, n_students=max(names, default=200))
+    steps = []
+    for rate in map(float, args.rates.split(',')):
+        steps.append(run_step(client, workload, rate, args.duration, args.clients, args.interval))
+        print(format_summary(steps[-1]), end='\n\n', flush=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(steps, f, indent=2)
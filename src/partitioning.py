@@ -0,0 +1,128 @@
+"""
+Hash partitioning of student_course by student: migration and benchmark.
+
+New databases get the partitioned layout from create_all if STUDENT_COURSE_PARTITIONS env variable is set
+(see db.make_student_course). An existing db is migrated (or reverted with 0) keeping all rows and ids:
+
+python -m src.partitioning migrate 16
+
+The benchmark fills a separate db (prefix bench_) with growing numbers of enrollments for both layouts
+and measures per-student lookups (db.get_student) and enrollment writes (add and remove a course):
+
+python -m src.partitioning bench --sizes 10000,100000,1000000 --partitions 16
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy_utils.functions import database_exists, create_database
+
+from src import data, db
+
+COURSES_PER_STUDENT = 3
+
+
+def migrate(partitions: int) -> None:
+    before = db.student_course_partitions()
+    started = time.monotonic()
+    db.repartition_student_course(partitions)
+    print(f'student_course: {before} -> {db.student_course_partitions()} partitions '
+          f'in {time.monotonic() - started:.1f}s')
+
+
+def fill_bench_db(enrollments: int) -> int:
+    """Recreate all the tables and fill them with enrollments rows (COURSES_PER_STUDENT per student).
+
+    Student names are unique: first names from data.py, last names from data.py with the student number.
+    Returns the number of students."""
+    n_students = enrollments // COURSES_PER_STUDENT
+    db.metadata_obj.drop_all(db.engine, checkfirst=True)
+    db.metadata_obj.create_all(db.engine)
+    with db.engine.connect() as conn:
+        conn.execute(insert(db.group), [{'name': g} for g in data.generate_groups(10)])
+        conn.execute(insert(db.course), [{'name': c, 'description': c} for c in data.COURSES])
+        conn.exec_driver_sql(
+            'INSERT INTO student (first_name, last_name, "group") '
+            'SELECT (%(first)s::text[])[1 + n %% %(n_first)s], '
+            '(%(last)s::text[])[1 + n %% %(n_last)s] || n, '
+            '1 + n %% 10 '
+            'FROM generate_series(1, %(n)s) n',
+            {'first': data.FIRST_NAMES, 'n_first': len(data.FIRST_NAMES),
+             'last': data.LAST_NAMES, 'n_last': len(data.LAST_NAMES), 'n': n_students})
+        # courses 1 + (id + k) % n_courses for k < COURSES_PER_STUDENT are distinct for every student
+        conn.exec_driver_sql(
+            'INSERT INTO student_course (student, course) '
+            'SELECT s.id, 1 + (s.id + k) %% %(n_courses)s FROM student s, generate_series(0, %(k)s) k',
+            {'n_courses': len(data.COURSES), 'k': COURSES_PER_STUDENT - 1})
+        conn.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('VACUUM ANALYZE')
+    return n_students
+
+
+def timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def percentiles_ms(values: list) -> tuple:
+    if not values:
+        return 0.0, 0.0
+    values = sorted(values)
+    return values[len(values) // 2] * 1000, values[int(len(values) * 0.99)] * 1000
+
+
+def add_enrollment(student_id: int, course_id: int) -> None:
+    """Insert a student_course row by ids (db.add_student_to_course looks the student up by name with a seq scan)"""
+    with db.engine.connect() as conn:
+        conn.execute(insert(db.student_course).values(student=student_id, course=course_id))
+        conn.commit()
+
+
+def measure(n_students: int, operations: int) -> dict:
+    """Latency percentiles (ms) of lookups and enrollment writes for random students"""
+    lookups, adds, removes = [], [], []
+    for _ in range(operations):
+        student_id = random.randint(1, n_students)
+        lookups.append(timed(db.get_student, student_id))
+        # a course the student does not attend yet
+        course_id = 1 + (student_id + COURSES_PER_STUDENT) % len(data.COURSES)
+        adds.append(timed(add_enrollment, student_id, course_id))
+        removes.append(timed(db.remove_student_from_course, student_id, course_id))
+    return {'lookup': percentiles_ms(lookups), 'add': percentiles_ms(adds), 'remove': percentiles_ms(removes)}
+
+
+def bench(sizes: list, partitions: int, operations: int) -> None:
+    before, _, after = str(db.URL).rpartition('/')
+    db.engine = create_engine(before + '/bench_' + after, echo=False, future=True)
+    if not database_exists(db.engine.url):
+        create_database(db.engine.url)
+    print(f"{'layout':<16}{'enrollments':>12}{'lookup p50/p99 ms':>20}{'add p50/p99 ms':>20}{'remove p50/p99 ms':>20}")
+    for size in sizes:
+        n_students = fill_bench_db(size)
+        for layout in (0, partitions):
+            db.repartition_student_course(layout)
+            res = measure(n_students, operations)
+            name = f'{layout} partitions' if layout else 'single table'
+            print(f'{name:<16}{size:>12}' + ''.join(f'{p50:>12.3f}/{p99:<7.3f}' for p50, p99 in res.values()),
+                  flush=True)
+
+
+parser = argparse.ArgumentParser('Hash partitioning of student_course by student')
+subparsers = parser.add_subparsers(dest='command', required=True)
+migrate_parser = subparsers.add_parser('migrate', help='Rebuild student_course with N partitions keeping the data')
+migrate_parser.add_argument('partitions', type=int, help='Number of hash partitions (0 - single table)')
+bench_parser = subparsers.add_parser('bench', help='Compare layouts as the table grows (uses bench_ db)')
+bench_parser.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated enrollment counts')
+bench_parser.add_argument('--partitions', type=int, default=16, help='Number of partitions to compare with')
+bench_parser.add_argument('--operations', type=int, default=500, help='Measured operations per layout and size')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.command == 'migrate':
+        migrate(args.partitions)
+    else:
+        bench([int(size) for size in args.sizes.split(',')], args.partitions, args.operations)
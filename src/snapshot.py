@@ -0,0 +1,218 @@
+"""
+Embedded read-only snapshot backend for read-heavy nodes.
+
+A consistent snapshot (one REPEATABLE READ transaction) of all the db tables is exported into a local SQLite file
+with the same schema and indexes (see snapshot_metadata). SnapshotReader serves the db read functions from it,
+memory-mapped, in process. Writes still go to PostgreSQL: every change notification (see cache.InvalidationListener)
+bumps the data version, and the refresher thread exports a new snapshot and swaps it in atomically.
+Until the first snapshot and while notifications are not received, reads go directly to PostgreSQL.
+Snapshot reads are optional - see enable_snapshot() and the -s CLI option in app.py.
+
+Export a snapshot file only: python -m src.snapshot PATH
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import MetaData, create_engine, event, insert, select, pool
+from sqlalchemy.engine import Engine
+
+import src.db as db
+from src import cache
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+MMAP_SIZE = 256 * 1024 * 1024
+
+snapshot_reader = None
+listener = None
+
+
+def snapshot_metadata() -> MetaData:
+    """Schema of the snapshot: the db tables with student_course never partitioned (not supported by SQLite)"""
+    metadata = MetaData()
+    for table in db.metadata_obj.sorted_tables:
+        if table.name != db.student_course.name:
+            table.to_metadata(metadata)
+    db.make_student_course(metadata)
+    return metadata
+
+
+def export_snapshot(path: str) -> None:
+    """Export a consistent snapshot of all the db tables into a new SQLite file at path (replaced atomically)"""
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    target = create_engine(f'sqlite:///{tmp_path}', future=True)
+    metadata = snapshot_metadata()
+    metadata.create_all(target)
+    with db.engine.connect() as source:
+        source = source.execution_options(isolation_level='REPEATABLE READ', stream_results=True)
+        with target.begin() as conn:
+            for table in metadata.sorted_tables:
+                for rows in source.execute(select(table)).mappings().partitions(CHUNK_SIZE):
+                    conn.execute(insert(table), rows)
+            conn.exec_driver_sql('ANALYZE')
+        source.rollback()
+    target.dispose()
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path: str) -> Engine:
+    """Return a read-only memory-mapped engine for the snapshot file"""
+    engine = create_engine(f'sqlite:///file:{path}?mode=ro&uri=true', future=True,
+                           poolclass=pool.QueuePool, connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+        cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+
+    return engine
+
+
+class SnapshotReader:
+    """Serves the db read functions from the latest local snapshot.
+
+    Implements evict/activate/deactivate to be driven by cache.InvalidationListener"""
+
+    def __init__(self, directory: str, min_interval: float = 1.0):
+        self.directory = directory
+        self.min_interval = min_interval
+        self.version = 0
+        self.snapshot_version = None
+        self.activation_version = 0
+        self.listening = False
+        self.engine = None
+        self._path = None
+        self._previous = None
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._refresher = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+
+    def get_all_students(self) -> list:
+        return db.get_all_students(bind=self._bind())
+
+    def get_student(self, id: int) -> dict:
+        return db.get_student(id, bind=self._bind())
+
+    def find_groups_with_fewer_or_equal_students(self, n: int = 20) -> list:
+        return db.find_groups_with_fewer_or_equal_students(n, bind=self._bind())
+
+    def find_students_from_course(self, course_name: str) -> list:
+        return db.find_students_from_course(course_name, bind=self._bind())
+
+    def evict(self, table: str, ids: Optional[list]) -> None:
+        """Data changed: a new snapshot is needed"""
+        self.version += 1
+        self._changed.set()
+
+    def activate(self) -> None:
+        """Notifications are being received, changes before that could be missed.
+
+        Reads stay on db until a snapshot exported after this is swapped in (see _bind)"""
+        self.evict(db.student.name, None)
+        self.activation_version = self.version
+        self.listening = True
+
+    def deactivate(self) -> None:
+        """Notifications could be missed: read from db until activated again"""
+        self.listening = False
+
+    def refresh(self) -> bool:
+        """Export and swap in a new snapshot if the data version changed. Returns True if swapped"""
+        version = self.version
+        if version == self.snapshot_version:
+            return False
+        path = os.path.join(self.directory, f'snapshot-{os.getpid()}-{version}.sqlite')
+        export_snapshot(path)
+        retired = self._previous
+        if self.engine is not None:
+            # a request may have taken the old engine just before the swap and not connected yet,
+            # so the old snapshot is kept until the next swap
+            self._previous = self.engine, self._path
+        self.engine, self._path, self.snapshot_version = open_snapshot(path), path, version
+        if retired is not None:
+            self._remove(*retired)
+        return True
+
+    def start(self) -> None:
+        self._refresher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._changed.set()
+        if self._refresher.is_alive():
+            self._refresher.join()
+        if self._previous is not None:
+            self._remove(*self._previous)
+            self._previous = None
+        if self.engine is not None:
+            self._remove(self.engine, self._path)
+
+    @staticmethod
+    def _remove(engine: Engine, path: str) -> None:
+        engine.dispose()  # connections in use keep the file open until they are returned
+        os.remove(path)
+
+    def _bind(self) -> Optional[Engine]:
+        fresh = self.snapshot_version is not None and self.snapshot_version >= self.activation_version
+        return self.engine if self.listening and fresh else None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._changed.wait()
+            self._changed.clear()
+            if self._stopped.is_set():
+                break
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Snapshot export failed')
+                self._changed.set()
+            # changes during min_interval are coalesced into one export
+            self._stopped.wait(max(0.0, self.min_interval - (time.monotonic() - started)))
+
+
+def enable_snapshot(directory: str, min_interval: float = 1.0) -> SnapshotReader:
+    """Serve API reads from a new SnapshotReader refreshed on change notifications"""
+    global snapshot_reader, listener
+    disable_snapshot()
+    os.makedirs(directory, exist_ok=True)
+    snapshot_reader = SnapshotReader(directory, min_interval)
+    snapshot_reader.start()
+    listener = cache.InvalidationListener(snapshot_reader)
+    listener.start()
+    return snapshot_reader
+
+
+def disable_snapshot() -> None:
+    """Stop the listener and the refresher (if any), API will read via cache or db"""
+    global snapshot_reader, listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+    if snapshot_reader is not None:
+        snapshot_reader.stop()
+        snapshot_reader = None
+
+
+def reader():
+    """Return the object to read with: the snapshot reader if enabled, otherwise see cache.reader()"""
+    return snapshot_reader or cache.reader()
+
+
+parser = argparse.ArgumentParser('Export a consistent read-only SQLite snapshot of the students database')
+parser.add_argument('path', help='Snapshot file path (replaced atomically)')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    export_snapshot(args.path)
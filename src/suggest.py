@@ -0,0 +1,82 @@
+"""
+In-memory prefix index of student names for autocomplete (see db.suggest_students).
+
+Names are kept in a sorted array of lowercase keys, both "first last" and "last first",
+so a prefix of either name is found by binary search without touching the database.
+Writes of other processes reach the index via change notifications (see cache.NameIndexUpdater).
+"""
+
+import bisect
+import threading
+
+
+class NameIndex:
+    """Sorted array of (name key, student id) with the names by id"""
+
+    def __init__(self):
+        self.loaded = False
+        self._keys = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def load(self, students: list) -> None:
+        """Replace the index contents with students: (id, first_name, last_name) rows"""
+        names = {id: (first_name, last_name) for id, first_name, last_name in students}
+        keys = sorted(key for id, (first_name, last_name) in names.items()
+                      for key in self._make_keys(id, first_name, last_name))
+        with self._lock:
+            self._names = names
+            self._keys = keys
+            self.loaded = True
+
+    def add(self, id: int, first_name: str, last_name: str) -> None:
+        with self._lock:
+            self._add(id, first_name, last_name)
+
+    def remove(self, id: int) -> None:
+        with self._lock:
+            self._remove(id)
+
+    def update(self, ids: list, students: list) -> None:
+        """Replace the entries of ids with students: (id, first_name, last_name) rows (missing ids are removed)"""
+        with self._lock:
+            for id in ids:
+                self._remove(id)
+            for id, first_name, last_name in students:
+                self._add(id, first_name, last_name)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        """Return up to limit dicts (id, first_name, last_name) of students with full name starting with prefix.
+
+        Case-insensitive, the prefix can start with either first or last name. Sorted by the matched name."""
+        prefix = ' '.join(prefix.split()).casefold()
+        found = []
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(found) < limit and self._keys[i][0].startswith(prefix):
+                id = self._keys[i][1]
+                if id not in found:
+                    found.append(id)
+                i += 1
+            names = [self._names[id] for id in found]
+        return [{'id': id, 'first_name': first_name, 'last_name': last_name}
+                for id, (first_name, last_name) in zip(found, names)]
+
+    def _add(self, id: int, first_name: str, last_name: str) -> None:
+        self._remove(id)
+        self._names[id] = first_name, last_name
+        for key in self._make_keys(id, first_name, last_name):
+            bisect.insort(self._keys, key)
+
+    def _remove(self, id: int) -> None:
+        if id not in self._names:
+            return
+        first_name, last_name = self._names.pop(id)
+        for key in self._make_keys(id, first_name, last_name):
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    @staticmethod
+    def _make_keys(id: int, first_name: str, last_name: str) -> tuple:
+        return (f'{first_name} {last_name}'.casefold(), id), (f'{last_name} {first_name}'.casefold(), id)
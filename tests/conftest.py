@@ -1,5 +1,7 @@
 """Test configuration and fixtures. For tests the newly created db is used, one for the whole testing session"""
 
+import time
+
 import pytest
 import sqlalchemy.engine
 from sqlalchemy_utils.functions import database_exists, create_database
@@ -30,3 +32,11 @@ def test_db() -> sqlalchemy.engine.Engine:
 def test_client():
     """Return Flask test client for API testing"""
     return app.test_client()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    """Wait until condition() is true, return its last value"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
@@ -0,0 +1,83 @@
+""" Tests for admission control of API routes. """
+
+import json
+import threading
+
+import pytest
+
+from src import admission, db
+from src.app import API_PREFIX
+
+
+def test_limiter_queue_and_rejection():
+    """Test that requests over the limit wait in the queue and are rejected when it is full"""
+    limiter = admission.AdmissionLimiter('test', max_concurrency=1, max_queue=1, queue_timeout=5,
+                                         statement_timeout=1000)
+    assert limiter.acquire()
+
+    waiter_result = []
+    waiter = threading.Thread(target=lambda: waiter_result.append(limiter.acquire()))
+    waiter.start()
+    while limiter.stats()['waiting'] == 0:
+        pass
+    assert not limiter.acquire()
+
+    limiter.release()
+    waiter.join()
+    assert waiter_result == [True]
+    assert limiter.stats()['rejected'] == 1
+
+    short_wait = admission.AdmissionLimiter('test', 1, 1, queue_timeout=0.01, statement_timeout=1000)
+    assert short_wait.acquire()
+    assert not short_wait.acquire()
+    assert short_wait.stats()['timed_out'] == 1
+
+
+@pytest.fixture()
+def full_reads(monkeypatch):
+    """Replace the reads limiter with one that has no free slots and no queue"""
+    limiter = admission.AdmissionLimiter(admission.READS, 1, 0, 0.01, 1000)
+    limiter.acquire()
+    monkeypatch.setitem(admission.limiters, admission.READS, limiter)
+    return limiter
+
+
+def test_overloaded_route_returns_503(test_client, full_reads):
+    """Test that reads are shed with 503 and Retry-After, writes and stats are not affected"""
+    r = test_client.get(API_PREFIX + 'students/')
+    assert r.status_code == 503
+    assert r.headers['Retry-After'] == str(admission.RETRY_AFTER)
+
+    r = test_client.delete(API_PREFIX + 'students/remove_course/', data={'student_id': 0, 'course_id': 0})
+    assert r.status_code == 404
+
+    r = test_client.get(API_PREFIX + 'admission/')
+    assert r.status_code == 200
+    stats = json.loads(r.data)['Admission']
+    assert stats['reads']['rejected'] == 1
+    assert stats['reads']['active'] == 1
+
+
+def sleep_in_db(*args):
+    """Stand-in for a slow db function: runs longer than the statement timeouts of the test"""
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('SELECT pg_sleep(1)')
+
+
+def test_statement_timeout_returns_503(test_client, monkeypatch):
+    """Test that reads and writes cancelled by the statement timeout get 503 with Retry-After and are counted"""
+    for name in (admission.READS, admission.WRITES):
+        monkeypatch.setitem(admission.limiters, name, admission.AdmissionLimiter(name, 1, 0, 0.01, 50))
+    monkeypatch.setattr(db, 'get_all_students', sleep_in_db)
+    monkeypatch.setattr(db, 'delete_student', sleep_in_db)
+
+    r = test_client.get(API_PREFIX + 'students/')
+    assert r.status_code == 503
+    assert r.headers['Retry-After'] == str(admission.RETRY_AFTER)
+    r = test_client.delete(API_PREFIX + 'students/1/')
+    assert r.status_code == 503
+
+    stats = admission.stats()
+    assert stats['reads']['statement_timeouts'] == 1
+    assert stats['writes']['statement_timeouts'] == 1
+    assert stats['reads']['active'] == stats['writes']['active'] == 0
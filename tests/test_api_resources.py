@@ -32,6 +32,7 @@ def test_delete_student(test_client):
     """Test the deletion of student"""
     r = test_client.delete(API_PREFIX + 'student/199/')
     assert r.status_code == 200
+    assert json.loads(r.data)['Student']['id'] == '199'
     r = test_client.delete(API_PREFIX + 'student/199/')
     assert r.status_code == 404
 
@@ -41,6 +42,7 @@ def test_add_student(test_client):
     data = dict(first_name='First', last_name='Last', group_id=1)
     r = test_client.post(API_PREFIX + 'students/add/', data=data)
     assert r.status_code == 201
+    assert json.loads(r.data)['Student']['first_name'] == 'First'
     r = test_client.post(API_PREFIX + 'students/add/', data={})
     assert r.status_code == 400
 
@@ -82,6 +84,7 @@ def test_student_to_course(test_db, test_client):
     params = {'student_name': f'{first} {last}', 'course_name': new_course}
     r = test_client.post(API_PREFIX + 'students/add_course/', data=params)
     assert r.status_code == 201
+    assert new_course in json.loads(r.data)['Student']['courses']
 
     # checking his info again
     r = test_client.get(API_PREFIX + 'students/5/')
@@ -0,0 +1,78 @@
+""" Tests for group commit of enrollment changes. """
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import sqlalchemy.exc
+from sqlalchemy import select
+
+from src import db, batching
+from src.db import student_course
+
+
+@pytest.fixture()
+def batcher():
+    """Return a running EnrollmentBatcher, closed after the test"""
+    b = batching.EnrollmentBatcher(max_items=5, max_delay=0.05)
+    yield b
+    b.close()
+
+
+def test_batched_add_and_remove(test_db, batcher):
+    """Test that concurrent enrollment changes are committed and every caller gets its own result"""
+    student_id = db.add_student('Batch', 'Student', 1)['id']
+    try:
+        courses = db.data.COURSES[:4]
+
+        with ThreadPoolExecutor(len(courses)) as executor:
+            enrolled = list(executor.map(lambda c: batcher.add_student_to_course('Batch Student', c), courses))
+        for course_name, info in zip(courses, enrolled):
+            assert info['id'] == student_id
+            assert course_name in info['courses']
+
+        with test_db.connect() as conn:
+            rows = conn.execute(select(student_course.c.course)
+                                .where(student_course.c.student == student_id)).all()
+        assert len(rows) == len(courses)
+
+        course_ids = [row.course for row in rows]
+        pairs = [(student_id, course_ids[0]), (student_id, course_ids[0]), (student_id, course_ids[1])]
+        with ThreadPoolExecutor(len(pairs)) as executor:
+            res = list(executor.map(lambda p: batcher.remove_student_from_course(*p), pairs))
+        assert sorted(res) == [0, 1, 1]
+    finally:
+        db.delete_student(student_id)
+
+
+def test_batched_errors_go_to_their_callers(test_db, batcher, monkeypatch):
+    """Test that a failing change does not fail the other changes of its batch, and only it is run again alone"""
+    student_id = db.add_student('Batch', 'Duplicate', 1)['id']
+    try:
+        batcher.add_student_to_course('Batch Duplicate', 'Aviation')
+        serial_adds = []
+        add_student_to_course = db.add_student_to_course
+        monkeypatch.setattr(db, 'add_student_to_course',
+                            lambda *args: serial_adds.append(args) or add_student_to_course(*args))
+
+        with ThreadPoolExecutor(2) as executor:
+            duplicate = executor.submit(batcher.add_student_to_course, 'Batch Duplicate', 'Aviation')
+            new = executor.submit(batcher.add_student_to_course, 'Batch Duplicate', 'Music')
+            with pytest.raises(sqlalchemy.exc.IntegrityError):
+                duplicate.result()
+            assert 'Music' in new.result()['courses']
+        assert ('Batch Duplicate', 'Music') not in serial_adds
+    finally:
+        db.delete_student(student_id)
+
+
+def test_batch_runs_with_callers_statement_timeout(test_db, batcher, monkeypatch):
+    """Test that the statement timeout of the caller (set by admission control) applies to its batch"""
+    seen = []
+    monkeypatch.setattr(batching, '_delete_many',
+                        lambda conn, pairs: seen.append(db.statement_timeout.get()) or [0] * len(pairs))
+    token = db.statement_timeout.set(1234)
+    try:
+        assert batcher.remove_student_from_course(1, 1) == 0
+    finally:
+        db.statement_timeout.reset(token)
+    assert seen == [1234]
@@ -0,0 +1,66 @@
+""" Tests for the read cache invalidated via LISTEN/NOTIFY. """
+
+import time
+
+import pytest
+
+from src import db, cache
+from tests.conftest import wait_for
+
+
+@pytest.fixture()
+def read_cache():
+    """Return a ReadCache with a running InvalidationListener, stopped after the test"""
+    c = cache.ReadCache()
+    listener = cache.InvalidationListener(c, poll_timeout=0.1)
+    listener.start()
+    for _ in range(50):
+        if c.active:
+            break
+        time.sleep(0.1)
+    yield c
+    listener.stop()
+
+
+def test_reads_are_cached(test_db, read_cache):
+    """Test that repeated reads are served from the cache"""
+    assert read_cache.active
+    assert read_cache.get_student(3) is read_cache.get_student(3)
+    assert read_cache.get_all_students() is read_cache.get_all_students()
+    assert read_cache.find_groups_with_fewer_or_equal_students(30) is \
+           read_cache.find_groups_with_fewer_or_equal_students(30)
+
+
+def test_writes_evict_affected_entries(test_db, read_cache):
+    """Test that a committed write evicts only the entries of the changed student"""
+    student = read_cache.get_student(3)
+    other = read_cache.get_student(4)
+    groups = read_cache.find_groups_with_fewer_or_equal_students(30)
+    new_course = next(c for c in db.data.COURSES if c not in student['courses'])
+
+    db.add_student_to_course(f"{student['first_name']} {student['last_name']}", new_course)
+    assert wait_for(lambda: new_course in read_cache.get_student(3)['courses'])
+    assert read_cache.get_student(4) is other
+    assert read_cache.find_groups_with_fewer_or_equal_students(30) is groups
+
+    added = db.add_student('Cached', 'Student', 1)
+    db.delete_student(added['id'])
+    assert wait_for(lambda: read_cache.find_groups_with_fewer_or_equal_students(30) is not groups)
+    assert wait_for(lambda: added['id'] not in [s['id'] for s in read_cache.get_all_students()])
+
+
+def test_own_writes_are_evicted_on_commit(test_db):
+    """Test that a write of this process is seen by its next read without waiting for the notification"""
+    read_cache = cache.enable_cache()
+    try:
+        assert wait_for(lambda: read_cache.active)
+        student = read_cache.get_student(4)
+        new_course = next(c for c in db.data.COURSES if c not in student['courses'])
+
+        db.add_student_to_course(f"{student['first_name']} {student['last_name']}", new_course)
+        assert new_course in read_cache.get_student(4)['courses']
+        db.remove_student_from_course(4, db.data.COURSES.index(new_course) + 1)
+        assert new_course not in read_cache.get_student(4)['courses']
+    finally:
+        cache.disable_cache()
+    assert read_cache.evict not in db.change_hooks
@@ -1,7 +1,8 @@
 """ Tests for db functions. """
 
 import pytest
-from sqlalchemy import select, inspect
+import sqlalchemy.exc
+from sqlalchemy import select, insert, inspect
 
 from src import db
 from src.db import student, group, course, student_course
@@ -61,8 +62,10 @@ def test_find_students_from_course(test_db, course_name):
 
 def test_add_student(test_db):
     """Test that student is added to db by name, surname and group id"""
-    id = db.add_student('Name', 'Surname', 1)
-    assert id is not None
+    added = db.add_student('Name', 'Surname', 1)
+    assert added['id'] is not None
+    assert added['group'] is not None
+    assert added['courses'] == []
     with test_db.connect() as conn:
         res = conn.execute(
             select(student.c.id) \
@@ -80,8 +83,16 @@ def test_delete_student(test_db):
     id = res.first().id
     assert id is not None
 
-    rowcount = db.delete_student(id)
-    assert rowcount == 1
+    if not db.get_student(id)['courses']:  # make sure the cascade has courses to report
+        with test_db.connect() as conn:
+            conn.execute(insert(student_course).values(student=id, course=1))
+            conn.commit()
+    courses = db.get_student(id)['courses']
+
+    deleted = db.delete_student(id)
+    assert deleted['id'] == id
+    assert sorted(deleted['courses']) == sorted(courses)
+    assert db.delete_student(id) is None
 
     # try to get deleted student id after deletion
     with test_db.connect() as conn:
@@ -106,7 +117,10 @@ def test_add_student_to_course(test_db):
     else:
         raise ValueError('All courses already attended')
 
-    db.add_student_to_course(first + ' ' + last, new_course_name)
+    courses = db.get_student(2)['courses']
+    enrolled = db.add_student_to_course(first + ' ' + last, new_course_name)
+    assert enrolled['id'] == 2
+    assert sorted(enrolled['courses']) == sorted(courses + [new_course_name])
     with test_db.connect() as conn:
         courses_tup = conn.execute(select(student_course.c.course).select_from(student)
                                    .join(student_course, isouter=True)
@@ -143,3 +157,48 @@ def test_get_student(test_db):
     assert isinstance(student, dict)
     assert 0 <= len(student['courses']) <= 3
 
+
+def test_delete_students_in_batches(test_db):
+    """Test that students are deleted by filters in batches of the given size"""
+    ids = [db.add_student('Bulk', f'Student{i}', 1)['id'] for i in range(5)]
+    db.add_student_to_course('Bulk Student0', 'Music')
+
+    music_id = data.COURSES.index('Music') + 1
+    filters = db.student_filters(id_from=ids[0], id_to=ids[-1], course_id=music_id)
+    assert db.count_students(filters) == 1
+    assert list(db.delete_students_in_batches(filters, batch_size=2)) == [1]
+
+    filters = db.student_filters(group_id=1, id_from=ids[0], id_to=ids[-1])
+    assert list(db.delete_students_in_batches(filters, batch_size=2)) == [2, 2]
+    assert db.count_students(filters) == 0
+
+    with pytest.raises(ValueError):
+        db.student_filters()
+    with pytest.raises(ValueError):
+        next(db.delete_students_in_batches(filters, batch_size=0))
+
+
+def test_repartition_student_course(test_db):
+    """Test that student_course is migrated to hash partitions and back keeping rows, ids and constraints"""
+    with test_db.connect() as conn:
+        rows = conn.execute(select(student_course).order_by(student_course.c.id)).all()
+    initial_partitions = db.student_course_partitions()
+
+    db.repartition_student_course(4)
+    try:
+        assert db.student_course_partitions() == 4
+        with test_db.connect() as conn:
+            assert conn.execute(select(student_course).order_by(student_course.c.id)).all() == rows
+        assert inspect(test_db).get_unique_constraints('student_course')
+
+        added = db.add_student('Partitioned', 'Student', 1)
+        enrolled = db.add_student_to_course('Partitioned Student', 'Music')
+        assert enrolled['courses'] == ['Music']
+        with pytest.raises(sqlalchemy.exc.IntegrityError):
+            db.add_student_to_course('Partitioned Student', 'Music')
+        db.delete_student(added['id'])
+        with test_db.connect() as conn:
+            assert conn.execute(select(student_course).where(student_course.c.student == added['id'])).all() == []
+    finally:
+        db.repartition_student_course(initial_partitions)
+    assert db.student_course_partitions() == initial_partitions
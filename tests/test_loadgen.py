@@ -0,0 +1,42 @@
+""" Tests for the load generator (without a running server). """
+
+import pytest
+
+from src import db, loadgen
+
+
+def test_workload_requests_hit_routes(test_client):
+    """Test that generated reads and searches are served by the app"""
+    names = {s['id']: f"{s['first_name']} {s['last_name']}" for s in db.get_all_students()}
+    workload = loadgen.Workload({loadgen.READ: 1, loadgen.SEARCH: 1}, names)
+    for _ in range(30):
+        operation, method, path, form = workload.next_request()
+        r = test_client.open(path, method=method, data=form)
+        assert r.status_code == 200, operation
+
+
+def test_enrollments_of_existing_students():
+    """Test that enrollment changes are generated only for students with known names (not deleted)"""
+    names = {id: f'First Last{id}' for id in range(1, 201) if id % 3}
+    workload = loadgen.Workload({loadgen.WRITE: 1}, names)
+    assert workload.enrollments
+    assert all(student_id in names for student_id, _ in workload.enrollments)
+
+
+def test_recorder_summary():
+    """Test that latencies and results are summarized per operation and per interval"""
+    recorder = loadgen.Recorder()
+    for i, status in enumerate([200, 201, 404, 503, None], start=1):
+        recorder.record('op', i / 1000, status)
+
+    interval = recorder.take_interval(1.0)
+    assert interval['rps'] == 5
+    assert interval['errors'] == 1
+    assert interval['shed'] == 1
+    assert recorder.take_interval(1.0)['rps'] == 0
+
+    summary = recorder.summary()['op']
+    assert summary['count'] == 5
+    assert summary['error_rate'] == summary['shed_rate'] == summary['client_error_rate'] == 0.2
+    assert summary['p50_ms'] == pytest.approx(3)
+    assert summary['max_ms'] == pytest.approx(5)
@@ -0,0 +1,87 @@
+""" Tests for the read-only SQLite snapshot backend. """
+
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, func
+
+from src import db, snapshot
+from src.app import API_PREFIX
+
+
+@pytest.fixture()
+def reader(tmp_path):
+    """Return a SnapshotReader (without listener and refresher threads) with the first snapshot exported"""
+    r = snapshot.SnapshotReader(str(tmp_path))
+    r.activate()
+    r.refresh()
+    yield r
+    r.stop()
+
+
+def test_export_snapshot(test_db, tmp_path):
+    """Test that all the tables are exported with their rows and unique constraints"""
+    path = str(tmp_path / 'students.sqlite')
+    snapshot.export_snapshot(path)
+    exported = create_engine(f'sqlite:///{path}', future=True)
+    insp = inspect(exported)
+    assert insp.get_unique_constraints('student_course')
+
+    for table in db.metadata_obj.sorted_tables:
+        with test_db.connect() as conn:
+            expected = conn.execute(select(func.count()).select_from(table)).scalar()
+        with exported.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(table)).scalar() == expected
+    exported.dispose()
+
+
+def test_reads_from_snapshot(test_db, reader):
+    """Test that read functions return the same data from the snapshot as from db"""
+    assert reader.engine is not None
+    assert [dict(s) for s in reader.get_all_students()] == [dict(s) for s in db.get_all_students()]
+    assert sorted(reader.get_student(3)['courses']) == sorted(db.get_student(3)['courses'])
+    assert sorted(reader.find_groups_with_fewer_or_equal_students(30)) == \
+           sorted(db.find_groups_with_fewer_or_equal_students(30))
+    by_id = lambda s: (s['course'], s['id'])
+    assert sorted(reader.find_students_from_course('art'), key=by_id) == \
+           sorted(db.find_students_from_course('art'), key=by_id)
+
+
+def test_snapshot_swapped_on_change(test_db, reader):
+    """Test that a new snapshot is swapped in after a change and the old one is removed after the next swap"""
+    old_path = reader._path
+    added = db.add_student('Snapshot', 'Student', 1)
+    assert not reader.refresh()
+
+    reader.evict(db.student.name, [added['id']])
+    assert reader.refresh()
+    assert os.path.exists(old_path)
+    assert reader.get_student(added['id'])['last_name'] == 'Student'
+
+    db.delete_student(added['id'])
+    reader.evict(db.student.name, [added['id']])
+    assert reader.refresh()
+    assert not os.path.exists(old_path)
+    reader.deactivate()
+    assert reader.get_all_students()[-1]['id'] != added['id']
+
+
+def test_reads_from_db_until_fresh_snapshot_after_reconnect(test_db, reader):
+    """Test that after notifications were missed reads go to db until a snapshot taken after reconnect is swapped in"""
+    assert reader._bind() is reader.engine
+    reader.deactivate()
+    reader.activate()
+    assert reader._bind() is None
+    assert reader.refresh()
+    assert reader._bind() is reader.engine
+
+
+def test_api_reads_from_snapshot(test_client, reader, monkeypatch):
+    """Test that API reads (run with a statement timeout by admission control) are served from the snapshot"""
+    monkeypatch.setattr(snapshot, 'snapshot_reader', reader)
+    for path in ('students/', 'students/3/', 'groups_LE/30/', 'students/from_course/art/'):
+        r = test_client.get(API_PREFIX + path)
+        assert r.status_code == 200, path
+    assert json.loads(r.data)['Students']
+    assert reader.engine.pool.checkedin() > 0
@@ -0,0 +1,68 @@
+""" Tests for student name autocomplete. """
+
+import json
+
+from sqlalchemy import insert, delete
+
+from src import db, cache
+from src.app import API_PREFIX
+from src.suggest import NameIndex
+from tests.conftest import wait_for
+
+
+def test_name_index():
+    """Test that names are found by a prefix of first or last name, case-insensitive, and kept up to date"""
+    index = NameIndex()
+    index.load([(1, 'Anna', 'Ford'), (2, 'Alex', 'Stoll'), (3, 'Bob', 'Ford')])
+
+    assert [s['id'] for s in index.suggest('FORD')] == [1, 3]
+    assert [s['id'] for s in index.suggest('anna  f')] == [1]
+    assert [s['id'] for s in index.suggest('a', limit=1)] == [2]
+    assert index.suggest('x') == []
+
+    index.remove(3)
+    index.add(4, 'Zed', 'Forth')
+    assert [s['id'] for s in index.suggest('for')] == [1, 4]
+
+    index.update([1, 4, 5], [(1, 'Anna', 'Smith'), (5, 'Ed', 'Ford')])
+    assert [s['id'] for s in index.suggest('for')] == [5]
+
+
+def test_index_follows_writes(test_db):
+    """Test that added and deleted students are reflected in suggestions"""
+    added = db.add_student('Suggested', 'Student', 1)
+    assert added['id'] in [s['id'] for s in db.suggest_students('suggested st')]
+    db.delete_student(added['id'])
+    assert added['id'] not in [s['id'] for s in db.suggest_students('suggested st')]
+
+
+def test_index_follows_writes_of_other_processes(test_db):
+    """Test that students written by another process (bypassing add_student) reach the index via notifications"""
+    def suggested() -> list:
+        return [s['id'] for s in db.suggest_students('remote st')]
+
+    cache.enable_name_index_updates()
+    try:
+        with test_db.connect() as conn:
+            id = conn.execute(insert(db.student).values(first_name='Remote', last_name='Student', group=1)
+                              .returning(db.student.c.id)).scalar()
+            db.notify_changes(conn, db.student.name, [id])
+            db.commit(conn)
+        assert wait_for(lambda: id in suggested())
+
+        with test_db.connect() as conn:
+            conn.execute(delete(db.student).where(db.student.c.id == id))
+            db.notify_changes(conn, db.student.name, [id])
+            db.commit(conn)
+        assert wait_for(lambda: id not in suggested())
+    finally:
+        cache.disable_name_index_updates()
+
+
+def test_suggest_api(test_client):
+    """Test that suggestions are returned by the API for a prefix of a known student's name"""
+    student = db.get_student(3)
+    prefix = student['first_name'] + ' ' + student['last_name'][:2].lower()
+    r = test_client.get(API_PREFIX + f'students/suggest?q={prefix}')
+    assert r.status_code == 200
+    assert '3' in [s['id'] for s in json.loads(r.data)['Students']]